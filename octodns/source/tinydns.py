@@ -3,11 +3,11 @@
 #
 
 import logging
-import textwrap
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from ipaddress import ip_address
-from os import listdir
-from os.path import join
+from os import cpu_count, scandir
+from sys import intern
 
 from ..record import Record
 from .base import BaseSource
@@ -24,6 +24,46 @@ def _unique(values):
     return [dict(s) for s in set(frozenset(v.items()) for v in values)]
 
 
+def _expand_v6(s):
+    # TinyDNS files have the ipv6 address written in full, but with the colons
+    # removed. This inserts a colon every 4th character to make the address
+    # correct.
+    if len(s) != 32:
+        raise ValueError(f'{s!r} does not appear to be a full IPv6 address')
+    return (
+        f'{s[0:4]}:{s[4:8]}:{s[8:12]}:{s[12:16]}:'
+        f'{s[16:20]}:{s[20:24]}:{s[24:28]}:{s[28:32]}'
+    )
+
+
+def _valid_octet(o):
+    # decimal 0-255 w/o leading zeros, the same rules ip_address applies
+    return (
+        o.isascii()
+        and o.isdigit()
+        and int(o) < 256
+        and (o == '0' or o[0] != '0')
+    )
+
+
+def _ipv4_reverse(s):
+    # equivalent to ip_address(s).reverse_pointer w/o the overhead of building
+    # the address object
+    octets = s.split('.')
+    if len(octets) != 4 or not all(_valid_octet(o) for o in octets):
+        raise ValueError(f'{s!r} does not appear to be an IPv4 address')
+    a, b, c, d = octets
+    return f'{d}.{c}.{b}.{a}.in-addr.arpa'
+
+
+def _txt_decode(s):
+    # TinyDNS escapes special characters as octal, e.g. \072 for :, only pay
+    # for the codec round-trip when there's something to unescape
+    if '\\' in s:
+        s = s.encode('latin1').decode('unicode-escape')
+    return s.replace(';', '\\;')
+
+
 class TinyDnsBaseSource(BaseSource):
     SUPPORTS_GEO = False
     SUPPORTS_DYNAMIC = False
@@ -38,14 +78,21 @@ class TinyDnsBaseSource(BaseSource):
         return set(Record.registered_types().keys())
 
     def _ttl_for(self, lines, index):
-        # see if we can find a ttl on any of the lines, first one wins
+        # the lowest ttl on any of the lines wins, so the result doesn't depend
+        # on the order of lines/files. None if no line has one, the default is
+        # applied once everything for a record has been merged
+        ttl = None
         for line in lines:
             try:
-                return int(line[index])
+                value = line[index]
             except IndexError:
-                pass
-        # and if we don't use the default
-        return self.default_ttl
+                continue
+            # an empty field, e.g. `+fqdn:ip::timestamp`, means no ttl
+            if value:
+                value = int(value)
+                if ttl is None or value < ttl:
+                    ttl = value
+        return ttl
 
     def _records_for_at(self, zone, name, lines, arpa=False):
         # @fqdn:ip:x:dist:ttl:timestamp:lo
@@ -61,15 +108,16 @@ class TinyDnsBaseSource(BaseSource):
 
         ttl = self._ttl_for(lines, 4)
 
+        mx_suffix = f'.mx.{zone.name}'
         values = []
         for line in lines:
             mx = line[2]
             # if there's a . in the mx we hit a special case and use it as-is
             if '.' not in mx:
                 # otherwise we treat it as the MX hostnam and construct the rest
-                mx = f'{mx}.mx.{zone.name}'
+                mx = mx + mx_suffix
             elif mx[-1] != '.':
-                mx = f'{mx}.'
+                mx = mx + '.'
 
             # default distance is 0
             try:
@@ -128,10 +176,10 @@ class TinyDnsBaseSource(BaseSource):
                 # we're given
                 value = line[0]
                 addr = line[1]
-                if '.' not in addr:
-                    addr = u':'.join(textwrap.wrap(line[1], 4))
-                addr = ip_address(addr)
-                name = addr.reverse_pointer
+                if '.' in addr:
+                    name = _ipv4_reverse(addr)
+                else:
+                    name = ip_address(_expand_v6(addr)).reverse_pointer
 
             if value[-1] != '.':
                 value = f'{value}.'
@@ -165,15 +213,16 @@ class TinyDnsBaseSource(BaseSource):
 
         ttl = self._ttl_for(lines, 3)
 
+        ns_suffix = f'.ns.{zone.name}'
         values = []
         for line in lines:
             ns = line[2]
             # if there's a . in the ns we hit a special case and use it as-is
             if '.' not in ns:
                 # otherwise we treat it as the NS hostnam and construct the rest
-                ns = f'{ns}.ns.{zone.name}'
+                ns = ns + ns_suffix
             elif ns[-1] != '.':
-                ns = f'{ns}.'
+                ns = ns + '.'
 
             # if we have an IP then we need to create an A for the MX
             ip = line[1]
@@ -222,10 +271,7 @@ class TinyDnsBaseSource(BaseSource):
             return
 
         # collect our ip(s)
-        values = [
-            l[1].encode('latin1').decode('unicode-escape').replace(";", "\\;")
-            for l in lines
-        ]
+        values = [_txt_decode(l[1]) for l in lines]
 
         ttl = self._ttl_for(lines, 2)
 
@@ -244,12 +290,7 @@ class TinyDnsBaseSource(BaseSource):
             return
 
         # collect our ip(s)
-        ips = []
-        for line in lines:
-            # TinyDNS files have the ipv6 address written in full, but with the
-            # colons removed. This inserts a colon every 4th character to make
-            # the address correct.
-            ips.append(u':'.join(textwrap.wrap(line[1], 4)))
+        ips = [_expand_v6(l[1]) for l in lines]
 
         ttl = self._ttl_for(lines, 2)
 
@@ -269,15 +310,16 @@ class TinyDnsBaseSource(BaseSource):
 
         ttl = self._ttl_for(lines, 6)
 
+        srv_suffix = f'.srv.{zone.name}'
         values = []
         for line in lines:
             target = line[2]
             # if there's a . in the mx we hit a special case and use it as-is
             if '.' not in target:
                 # otherwise we treat it as the MX hostnam and construct the rest
-                target = f'{target}.srv.{zone.name}'
+                target = target + srv_suffix
             elif target[-1] != '.':
-                target = f'{target}.'
+                target = target + '.'
 
             # if we have an IP then we need to create an A for the SRV
             # has to be present, but can be empty
@@ -326,7 +368,7 @@ class TinyDnsBaseSource(BaseSource):
         # group by lines by the record type
         types = defaultdict(list)
         for line in lines:
-            types[line[1].upper()].append(line)
+            types[intern(line[1].upper())].append(line)
 
         classes = Record.registered_types()
         for _type, lines in types.items():
@@ -366,43 +408,96 @@ class TinyDnsBaseSource(BaseSource):
     }
 
     def _process_lines(self, zone, lines):
-        data = defaultdict(lambda: defaultdict(list))
+        data = {}
+        symbol_map = self.SYMBOL_MAP
+        skipped = set()
         for line in lines:
             symbol = line[0]
+            if symbol not in symbol_map:
+                # Something we don't care about, don't bother splitting it up
+                if symbol not in skipped:
+                    self.log.info(
+                        'skipping type %s, not supported/interested', symbol
+                    )
+                    skipped.add(symbol)
+                continue
 
-            # Skip type, remove trailing comments, and omit newline
-            line = line[1:].split('#', 1)[0]
-            # Split on :'s including :: and strip leading/trailing ws
-            line = [p.strip() for p in line.split(':')]
-            data[symbol][line[0]].append(line)
+            # Skip type and remove trailing comments
+            body = line[1:].partition('#')[0]
+            # Split on :'s including ::
+            line = body.split(':')
+            if ' ' in body or '\t' in body:
+                # strip leading/trailing ws, most lines don't have any
+                line = [p.strip() for p in line]
+            # the same names show up on lots of lines, share a single copy
+            name = line[0] = intern(line[0])
+            data.setdefault(symbol, {}).setdefault(name, []).append(line)
 
         return data
 
+    def _symbols(self, zone):
+        # first group lines by their symbol and name
+        return self._process_lines(zone, self._lines())
+
     def _process_symbols(self, zone, symbols, arpa):
-        types = defaultdict(lambda: defaultdict(list))
-        ttls = defaultdict(dict)
+        # (_type, name) -> [ttl, values]
+        records = {}
+        # bind things we'll use for every record to locals
+        symbol_map = self.SYMBOL_MAP
+        hostname_from_fqdn = zone.hostname_from_fqdn
+        # fqdn -> hostname, the same names show up for lots of types and
+        # hostname_from_fqdn runs idna encoding and a regex each time
+        hostnames = {}
+        # names in the data may or may not have the trailing dot
+        zone_name = zone.name
+        exact = (zone_name, zone_name[:-1])
+        suffixes = (f'.{zone_name}', f'.{zone_name[:-1]}')
+        skipped = 0
         for symbol, names in symbols.items():
-            records_for = self.SYMBOL_MAP.get(symbol, None)
-            if not records_for:
-                # Something we don't care about
-                self.log.info(
-                    'skipping type %s, not supported/interested', symbol
-                )
-                continue
-
+            # _process_lines only keeps symbols we have handlers for
+            records_for = symbol_map[symbol]
             for name, lines in names.items():
+                if (
+                    not arpa
+                    and name not in exact
+                    and not name.endswith(suffixes)
+                ):
+                    # outside of our zone, all of the non-arpa handlers would
+                    # bail on zone.owns so skip the call entirely
+                    skipped += 1
+                    continue
                 for _type, name, ttl, values in records_for(
                     self, zone, name, lines, arpa=arpa
                 ):
                     # remove the zone name
-                    name = zone.hostname_from_fqdn(name)
-                    types[_type][name].extend(values)
-                    # first non-default wins, if we never see anything we'll
-                    # just use the default below
-                    if ttl != self.default_ttl:
-                        ttls[_type][name] = ttl
+                    try:
+                        hostname = hostnames[name]
+                    except KeyError:
+                        hostname = hostnames[name] = intern(
+                            hostname_from_fqdn(name)
+                        )
+                    key = (_type, hostname)
+                    record = records.get(key)
+                    if record is None:
+                        records[key] = [ttl, list(values)]
+                        continue
+                    record[1].extend(values)
+                    # lowest explicit ttl wins, same as within _ttl_for
+                    if ttl is not None and (
+                        record[0] is None or ttl < record[0]
+                    ):
+                        record[0] = ttl
+
+        if skipped:
+            # one summary rather than a line per name, in shared data files
+            # most names will belong to other zones
+            self.log.debug(
+                '_process_symbols: skipped %d names not in %s',
+                skipped,
+                zone_name,
+            )
 
-        return types, ttls
+        return records
 
     def populate(self, zone, target=False, lenient=False):
         self.log.debug(
@@ -421,30 +516,31 @@ class TinyDnsBaseSource(BaseSource):
         # To deal with this we'll do things in 3 stages:
 
         # first group lines by their symbol and name
-        symbols = self._process_lines(zone, self._lines())
+        symbols = self._symbols(zone)
 
-        # then work through those to group values by their _type and name
+        # then work through those to group values and ttls by their _type and
+        # name in a single pass
         zone_name = zone.name
         arpa = zone_name.endswith('in-addr.arpa.') or zone_name.endswith(
             'ip6.arpa.'
         )
-        types, ttls = self._process_symbols(zone, symbols, arpa)
+        records = self._process_symbols(zone, symbols, arpa)
 
         # now we finally have all the values for each (soon to be) record
         # collected together, turn them into their coresponding record and add
         # it to the zone
-        for _type, names in types.items():
-            for name, values in names.items():
-                data = {
-                    'ttl': ttls[_type].get(name, self.default_ttl),
-                    'type': _type,
-                }
-                if len(values) > 1:
-                    data['values'] = _unique(values)
-                else:
-                    data['value'] = values[0]
-                record = Record.new(zone, name, data, lenient=lenient)
-                zone.add_record(record, lenient=lenient)
+        for (_type, name), (ttl, values) in records.items():
+            # if no line had a ttl we'll use the default
+            data = {
+                'ttl': self.default_ttl if ttl is None else ttl,
+                'type': _type,
+            }
+            if len(values) > 1:
+                data['values'] = _unique(values)
+            else:
+                data['value'] = values[0]
+            record = Record.new(zone, name, data, lenient=lenient)
+            zone.add_record(record, lenient=lenient)
 
         self.log.info(
             'populate:   found %s records', len(zone.records) - before
@@ -457,44 +553,106 @@ class TinyDnsFileSource(TinyDnsBaseSource):
 
     tinydns:
         class: octodns.source.tinydns.TinyDnsFileSource
-        # The location of the TinyDNS zone files
+        # The location of the TinyDNS zone files, either a single directory or
+        # a list of them
         directory: ./zones
+        # Also read files in sub-directories, hidden directories are skipped
+        # (optional, default False)
+        recursive: false
         # The ttl to use for records when not specified in the data
         # (optional, default 3600)
         default_ttl: 3600
+        # Read the files in the directory in parallel using a pool of threads,
+        # useful when there are a large number of files
+        # (optional, default False)
+        parallel_read: false
 
     NOTE: timestamps & lo fields are ignored if present.
 
+    NOTE: with very large numbers of data files, tens of thousands, listing and
+    opening files in a single directory can become the bottleneck. Sharding
+    them across several directories, possibly on different disks, and listing
+    those in `directory` or enabling `recursive` spreads that load out.
+
     The source intends to conform to and fully support the official spec,
     https://cr.yp.to/djbdns/tinydns-data.html and the common patch/extensions to
     support IPv6 and a few other record types,
     https://docs.bytemark.co.uk/article/tinydns-format/.
     '''
 
-    def __init__(self, id, directory, default_ttl=3600):
+    def __init__(
+        self,
+        id,
+        directory,
+        default_ttl=3600,
+        parallel_read=False,
+        recursive=False,
+    ):
         self.log = logging.getLogger(f'TinyDnsFileSource[{id}]')
         self.log.debug(
-            '__init__: id=%s, directory=%s, default_ttl=%d',
+            '__init__: id=%s, directory=%s, default_ttl=%d, parallel_read=%s, '
+            'recursive=%s',
             id,
             directory,
             default_ttl,
+            parallel_read,
+            recursive,
         )
         super().__init__(id, default_ttl)
         self.directory = directory
+        self.directories = (
+            [directory] if isinstance(directory, str) else directory
+        )
+        self.parallel_read = parallel_read
+        self.recursive = recursive
         self._cache = None
 
-    def _lines(self):
-        if self._cache is None:
-            # We unfortunately don't know where to look since tinydns stuff can
-            # be defined anywhere so we'll just read all files
-            lines = []
-            for filename in listdir(self.directory):
-                if filename[0] == '.':
-                    # Ignore hidden files
+    def _paths(self, directory):
+        with scandir(directory) as entries:
+            for entry in entries:
+                if entry.name[0] == '.':
+                    # Ignore hidden files & directories
                     continue
-                with open(join(self.directory, filename), 'r') as fh:
-                    lines += [l for l in fh.read().split('\n') if l]
+                if entry.is_file():
+                    yield entry.path
+                elif self.recursive and entry.is_dir(follow_symlinks=False):
+                    # symlinked directories aren't followed, they could loop
+                    # back on themselves or point at another shard
+                    yield from self._paths(entry.path)
+
+    def _read(self, path):
+        # stream through the buffered reader a line at a time rather than
+        # holding the whole contents and its split copy
+        with open(path, 'r') as fh:
+            for line in fh:
+                line = line.rstrip('\n')
+                if line:
+                    yield line
+
+    def _read_all(self, path):
+        return list(self._read(path))
 
-            self._cache = lines
+    def _lines(self):
+        # We unfortunately don't know where to look since tinydns stuff can be
+        # defined anywhere so we'll just read all files
+        paths = [p for d in self.directories for p in self._paths(d)]
+
+        if self.parallel_read:
+            # reading is dominated by open/read latency so overlap it, each
+            # worker has to hand back a whole file
+            max_workers = min(32, (cpu_count() or 1) * 4)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for lines in executor.map(self._read_all, paths):
+                    yield from lines
+            return
 
+        for path in paths:
+            yield from self._read(path)
+
+    def _symbols(self, zone):
+        # The grouped lines don't depend on the zone, every zone we populate
+        # would otherwise read & split all of the files again so we hold on to
+        # the result rather than the raw lines
+        if self._cache is None:
+            self._cache = super()._symbols(zone)
         return self._cache
@@ -2,15 +2,55 @@
 #
 #
 
+from collections.abc import Iterator
+from ipaddress import ip_address
+from os import makedirs, mkdir, symlink
+from os.path import join
 from unittest import TestCase
+from unittest.mock import patch
 
-from helpers import SimpleProvider
+from helpers import SimpleProvider, TemporaryDirectory
 
 from octodns.record import Record
-from octodns.source.tinydns import TinyDnsFileSource
+from octodns.source.tinydns import TinyDnsFileSource, _expand_v6, _ipv4_reverse
 from octodns.zone import Zone
 
 
+class TestTinyDnsHelpers(TestCase):
+    def test_expand_v6(self):
+        self.assertEqual(
+            '2a02:1348:017c:d5d0:0024:19ff:fef3:5742',
+            _expand_v6('2a021348017cd5d0002419fffef35742'),
+        )
+
+        # truncated or too long addresses are errors rather than expanding to
+        # something else
+        for addr in ('2001' * 6, '2001' * 9, '2a021348017cd5d0002419fffef3574'):
+            with self.assertRaises(ValueError):
+                _expand_v6(addr)
+
+    def test_ipv4_reverse(self):
+        for addr in ('10.2.3.4', '0.0.0.0', '192.168.1.142'):
+            self.assertEqual(
+                ip_address(addr).reverse_pointer, _ipv4_reverse(addr)
+            )
+
+        for addr in (
+            '10.2.3',
+            '10.2.3.4.5',
+            '10.2.3.256',
+            '10.2.3.07',
+            '10.2.3.',
+            '10.2.3.-1',
+            '10.2.3.x',
+        ):
+            with self.assertRaises(ValueError):
+                _ipv4_reverse(addr)
+            # same as ip_address
+            with self.assertRaises(ValueError):
+                ip_address(addr)
+
+
 class TestTinyDnsFileSource(TestCase):
     source = TinyDnsFileSource('test', './tests/zones/tinydns')
 
@@ -204,6 +244,181 @@ class TestTinyDnsFileSource(TestCase):
         changes = expected.changes(got, SimpleProvider())
         self.assertEqual([], changes)
 
+    def test_populate_parallel_read(self):
+        source = TinyDnsFileSource(
+            'test', './tests/zones/tinydns', parallel_read=True
+        )
+        self.assertEqual(sorted(self.source._lines()), sorted(source._lines()))
+
+        got = Zone('example.com.', [])
+        source.populate(got)
+        expected = Zone('example.com.', [])
+        self.source.populate(expected)
+        self.assertEqual(30, len(got.records))
+        self.assertEqual([], expected.changes(got, SimpleProvider()))
+
+    def test_records_for_not_owned(self):
+        # names outside of the zone are normally skipped before the handlers
+        # are called, but they still need to ignore them themselves
+        zone = Zone('example.com.', [])
+        for records_for in TinyDnsFileSource.SYMBOL_MAP.values():
+            self.assertEqual(
+                [], list(records_for(self.source, zone, 'www.other.foo', []))
+            )
+
+    def test_ttl_for(self):
+        # no lines
+        self.assertIsNone(self.source._ttl_for([], 2))
+        # no ttl field
+        self.assertIsNone(self.source._ttl_for([['www', '1.2.3.4']], 2))
+        # empty ttl field
+        self.assertIsNone(
+            self.source._ttl_for([['www', '1.2.3.4', '', '4']], 2)
+        )
+        # an explicit ttl matching the default is still explicit
+        self.assertEqual(
+            3600, self.source._ttl_for([['www', '1.2.3.4', '3600']], 2)
+        )
+        # lowest ttl wins, regardless of order
+        lines = [
+            ['www', '1.2.3.4'],
+            ['www', '1.2.3.5', ''],
+            ['www', '1.2.3.6', '43'],
+            ['www', '1.2.3.7', '42'],
+        ]
+        self.assertEqual(42, self.source._ttl_for(lines, 2))
+        self.assertEqual(42, self.source._ttl_for(lines[::-1], 2))
+        # garbage is still an error
+        with self.assertRaises(ValueError):
+            self.source._ttl_for([['www', '1.2.3.4', 'nope']], 2)
+
+    def test_populate_ttl_across_symbols(self):
+        with TemporaryDirectory() as td:
+            with open(join(td.dirname, 'data'), 'w') as fh:
+                fh.write(
+                    '+www.example.com:10.2.3.4\n'
+                    '+www.example.com:10.2.3.5:60\n'
+                    '=www.example.com:10.2.3.6:30\n'
+                    '+mx.example.com:10.2.3.7\n'
+                    '@www.example.com:10.2.3.8:mx.example.com.:10:7200\n'
+                    '+explicit.example.com:10.2.3.9:3600\n'
+                    '=explicit.example.com:10.2.3.10:86400\n'
+                )
+
+            got = Zone('example.com.', [])
+            TinyDnsFileSource('test', td.dirname).populate(got)
+            self.assertEqual(4, len(got.records))
+            records = {(r.name, r._type): r for r in got.records}
+            record = records[('www', 'A')]
+            # lowest ttl wins across types
+            self.assertEqual(30, record.ttl)
+            self.assertEqual(
+                ['10.2.3.4', '10.2.3.5', '10.2.3.6'], record.values
+            )
+            # a missing ttl doesn't win over a higher explicit one
+            self.assertEqual(7200, records[('mx', 'A')].ttl)
+            # an explicit ttl matching the default still counts
+            self.assertEqual(3600, records[('explicit', 'A')].ttl)
+
+    def test_populate_ttl_across_files(self):
+        with TemporaryDirectory() as td:
+            a = join(td.dirname, 'a')
+            b = join(td.dirname, 'b')
+            for dirname, line in (
+                (a, '+www.example.com:10.0.0.1:60'),
+                (b, '+www.example.com:10.0.0.2:30'),
+            ):
+                mkdir(dirname)
+                with open(join(dirname, 'data'), 'w') as fh:
+                    fh.write(f'{line}\n')
+
+            # same type & name in different files, lowest wins whichever order
+            # they're read in
+            for directories in ([a, b], [b, a]):
+                got = Zone('example.com.', [])
+                TinyDnsFileSource('test', directories).populate(got)
+                self.assertEqual(1, len(got.records))
+                record = list(got.records)[0]
+                self.assertEqual(30, record.ttl)
+                self.assertEqual(['10.0.0.1', '10.0.0.2'], record.values)
+
+    def test_populate_caches_symbols(self):
+        source = TinyDnsFileSource('test', './tests/zones/tinydns')
+        with patch.object(source, '_lines', wraps=source._lines) as lines_mock:
+            source.populate(Zone('example.com.', []))
+            source.populate(Zone('3.2.10.in-addr.arpa.', []))
+            got = Zone('example.com.', [])
+            source.populate(got)
+            # files were only read & parsed once
+            lines_mock.assert_called_once()
+        self.assertEqual(30, len(got.records))
+
+    def test_lines_is_lazy(self):
+        source = TinyDnsFileSource('test', './tests/zones/tinydns')
+        lines = source._lines()
+        self.assertIsInstance(lines, Iterator)
+        self.assertTrue(next(lines))
+
+    def test_lines_directories(self):
+        with TemporaryDirectory() as td:
+            for path, line in (
+                (('a', 'data'), '+a.example.com:10.2.3.4'),
+                (('a', 'sub', 'data'), '+a-sub.example.com:10.2.3.5'),
+                (('a', '.hidden', 'data'), '+a-hidden.example.com:10.2.3.6'),
+                (('b', 'data'), '+b.example.com:10.2.3.7'),
+            ):
+                dirname = join(td.dirname, *path[:-1])
+                makedirs(dirname, exist_ok=True)
+                with open(join(dirname, path[-1]), 'w') as fh:
+                    fh.write(f'{line}\n')
+
+            a = join(td.dirname, 'a')
+            b = join(td.dirname, 'b')
+            # a symlink to another shard and a cycle, neither will be followed
+            symlink(b, join(a, 'sub', 'to-b'))
+            symlink('..', join(a, 'sub', 'loop'))
+
+            source = TinyDnsFileSource('test', a)
+            self.assertEqual([a], source.directories)
+            self.assertEqual(['+a.example.com:10.2.3.4'], list(source._lines()))
+
+            source = TinyDnsFileSource('test', [a, b])
+            self.assertEqual(
+                ['+a.example.com:10.2.3.4', '+b.example.com:10.2.3.7'],
+                list(source._lines()),
+            )
+
+            source = TinyDnsFileSource('test', [a, b], recursive=True)
+            self.assertEqual(
+                [
+                    '+a-sub.example.com:10.2.3.5',
+                    '+a.example.com:10.2.3.4',
+                    '+b.example.com:10.2.3.7',
+                ],
+                sorted(source._lines()),
+            )
+
+    def test_process_lines_skips_unsupported(self):
+        self.assertEqual(
+            {'+': {'www.example.com': [['www.example.com', '10.2.3.4', '30']]}},
+            self.source._process_lines(
+                None,
+                [
+                    '# a comment',
+                    'Zexample.com:ns.example.com.:hostmaster.example.com.',
+                    '+www.example.com:10.2.3.4:30 # trailing',
+                    '%ex:10.2.3',
+                ],
+            ),
+        )
+
+    def test_populate_logs_skipped_summary(self):
+        with self.assertLogs(self.source.log, level='DEBUG') as logs:
+            self.source.populate(Zone('example.com.', []))
+        self.assertEqual(
+            1, len([l for l in logs.output if 'skipped 8 names not in' in l])
+        )
+
     def test_populate_normal_sub1(self):
         got = Zone('asdf.subtest.com.', [])
         self.source.populate(got)
@@ -274,3 +489,17 @@ class TestTinyDnsFileSource(TestCase):
         self.source.populate(got)
         # we don't see one www.sub.example.com. record b/c it's in a sub
         self.assertEqual(29, len(got.records))
+
+    def test_lines_skips_hidden_and_dirs(self):
+        with TemporaryDirectory() as td:
+            with open(join(td.dirname, 'data'), 'w') as fh:
+                fh.write('+www.example.com:10.2.3.4\n\n+example.com:10.2.3.5\n')
+            with open(join(td.dirname, '.hidden'), 'w') as fh:
+                fh.write('+hidden.example.com:10.2.3.6\n')
+            mkdir(join(td.dirname, 'sub'))
+
+            source = TinyDnsFileSource('test', td.dirname)
+            self.assertEqual(
+                ['+www.example.com:10.2.3.4', '+example.com:10.2.3.5'],
+                list(source._lines()),
+            )